@@ -1,12 +1,23 @@
 import bpy
+import hashlib
+import json
 import os
+import tempfile
 
 
 def import_model(file_path):
     """根据文件扩展名导入模型（支持 .glb 格式）"""
+    imported_objects = import_model_objects(file_path)
+    if not imported_objects:
+        return None
+    return imported_objects[-1]
+
+
+def import_model_objects(file_path):
+    """导入模型并返回全部导入对象"""
     if not os.path.exists(file_path):
         print(f"错误：文件 {file_path} 不存在！")
-        return None
+        return []
 
     # 根据文件扩展名选择导入方式
     if file_path.endswith(".obj"):
@@ -19,23 +30,23 @@ def import_model(file_path):
         bpy.ops.import_scene.gltf(filepath=file_path)  # GLB/GLTFSupport
     else:
         print(f"错误：不支持的文件格式（{os.path.splitext(file_path)[1]}）！")
-        return None
+        return []
 
-    # 获取导入的最后一个对象
     imported_objects = [obj for obj in bpy.context.selected_objects]
     if not imported_objects:
         print("错误：导入失败，未找到对象！")
-        return None
-    return imported_objects[-1]
+    return imported_objects
 
 
-def set_silver_material(target_obj):
-    """为对象设置银色材质"""
+def get_silver_material():
+    """获取银色材质，仅在首次创建时配置节点"""
     material_name = "Silver_Material"
     material = bpy.data.materials.get(material_name)
-    if not material:
-        material = bpy.data.materials.new(name=material_name)
-        material.use_nodes = True
+    if material:
+        return material
+
+    material = bpy.data.materials.new(name=material_name)
+    material.use_nodes = True
 
     # 配置材质节点（Principled BSDF）
     bsdf_node = material.node_tree.nodes.get('Principled BSDF')
@@ -44,13 +55,171 @@ def set_silver_material(target_obj):
         bsdf_node.inputs['Base Color'].default_value = (0.8, 0.8, 0.8, 1.0)
         bsdf_node.inputs['Metallic'].default_value = 1.0
         bsdf_node.inputs['Roughness'].default_value = 0.1
+    return material
+
+
+def set_silver_material(target_obj):
+    """为对象设置银色材质"""
+    set_silver_material_batch([target_obj])
+
+
+def set_silver_material_batch(objects):
+    """为所有网格对象的全部材质槽设置银色材质"""
+    material = get_silver_material()
+    count = 0
+    for obj in objects:
+        if obj.type != 'MESH':
+            continue
+        if not obj.material_slots:
+            obj.data.materials.append(material)
+        for slot in obj.material_slots:
+            slot.material = material
+        count += 1
+    print(f"成功设置银色材质！共 {count} 个对象")
+
+
+def _socket_value(value):
+    """将节点输入的默认值转为可序列化的数据"""
+    if isinstance(value, (bool, int, str)):
+        return value
+    if isinstance(value, float):
+        return round(value, 6)
+    try:
+        return [_socket_value(v) for v in value]
+    except TypeError:
+        return repr(value)
+
+
+# 所有节点共有的基础属性（名称、位置、标签等）不参与材质比较
+_NODE_BASE_PROPERTIES = {prop.identifier for prop in bpy.types.Node.bl_rna.properties}
 
-    # 应用材质到对象
-    if target_obj.data.materials:
-        target_obj.data.materials[0] = material
+
+def _node_properties(node):
+    """节点自身的 RNA 属性（插值、平铺方式、UV 通道、混合模式等），不含输入接口"""
+    properties = {}
+    for prop in node.bl_rna.properties:
+        if prop.identifier in _NODE_BASE_PROPERTIES or prop.type in {'POINTER', 'COLLECTION'}:
+            continue
+        value = getattr(node, prop.identifier, None)
+        if isinstance(value, set):
+            value = sorted(value)
+        properties[prop.identifier] = _socket_value(value)
+    return properties
+
+
+def material_signature(material):
+    """序列化材质节点参数，用于判断材质是否相同"""
+    data = {
+        'diffuse_color': _socket_value(material.diffuse_color),
+        'metallic': _socket_value(material.metallic),
+        'roughness': _socket_value(material.roughness),
+        'blend_method': material.blend_method,
+        'use_backface_culling': material.use_backface_culling,
+    }
+    if material.use_nodes and material.node_tree:
+        nodes = []
+        for node in sorted(material.node_tree.nodes, key=lambda n: n.name):
+            inputs = {}
+            for socket in node.inputs:
+                if not socket.is_linked and hasattr(socket, 'default_value'):
+                    inputs[socket.identifier] = _socket_value(socket.default_value)
+            entry = {'name': node.name, 'type': node.bl_idname, 'inputs': inputs,
+                     'properties': _node_properties(node)}
+            image = getattr(node, 'image', None)
+            if image is not None:
+                entry['image'] = image.filepath or image.name
+                entry['colorspace'] = image.colorspace_settings.name
+            nodes.append(entry)
+        links = sorted(
+            (l.from_node.name, l.from_socket.identifier, l.to_node.name, l.to_socket.identifier)
+            for l in material.node_tree.links
+        )
+        data['nodes'] = nodes
+        data['links'] = links
+    return json.dumps(data, sort_keys=True)
+
+
+def export_model(objects, file_path):
+    """按扩展名导出指定对象（与 import_model 支持的格式一致）"""
+    bpy.ops.object.select_all(action='DESELECT')
+    for obj in objects:
+        obj.select_set(True)
+    os.makedirs(os.path.dirname(os.path.abspath(file_path)), exist_ok=True)
+
+    if file_path.endswith(".obj"):
+        bpy.ops.export_scene.obj(filepath=file_path, use_selection=True)
+    elif file_path.endswith(".stl"):
+        bpy.ops.export_mesh.stl(filepath=file_path, use_selection=True)
+    elif file_path.endswith(".fbx"):
+        bpy.ops.export_scene.fbx(filepath=file_path, use_selection=True)
+    elif file_path.endswith(".glb"):
+        bpy.ops.export_scene.gltf(filepath=file_path, export_format='GLB', use_selection=True)
+    else:
+        raise ValueError(f"不支持的导出格式（{os.path.splitext(file_path)[1]}）")
+
+
+def measure_export_size(objects, suffix=".glb"):
+    """导出为临时文件（默认 GLB）并返回文件字节数"""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, "measure" + suffix)
+        export_model(objects, path)
+        return os.path.getsize(path)
+
+
+def remove_unused_materials():
+    """删除没有任何用户的材质，返回删除数量"""
+    unused = [material for material in bpy.data.materials if material.users == 0]
+    for material in unused:
+        bpy.data.materials.remove(material)
+    return len(unused)
+
+
+def deduplicate_materials(objects, measure_export=False):
+    """
+    合并参数相同的材质，并一次性重新分配所有网格的材质槽。
+    Returns:
+      collapsed: 被合并的材质数量
+      bytes_saved: measure_export 时为去重前后导出 GLB 的字节差，否则为 None
+    """
+    size_before = measure_export_size(objects) if measure_export else None
+
+    canonical = {}
+    replace = {}
+    seen = set()
+    for obj in objects:
+        if obj.type != 'MESH':
+            continue
+        for slot in obj.material_slots:
+            material = slot.material
+            if material is None or material.name in seen:
+                continue
+            seen.add(material.name)
+            key = hashlib.sha1(material_signature(material).encode()).hexdigest()
+            if key in canonical:
+                replace[material.name] = canonical[key]
+            else:
+                canonical[key] = material
+
+    # 重新分配所有材质槽
+    for obj in objects:
+        if obj.type != 'MESH':
+            continue
+        for slot in obj.material_slots:
+            if slot.material is not None and slot.material.name in replace:
+                slot.material = replace[slot.material.name]
+
+    for name in replace:
+        material = bpy.data.materials.get(name)
+        if material is not None and material.users == 0:
+            bpy.data.materials.remove(material)
+
+    bytes_saved = None
+    if measure_export:
+        bytes_saved = size_before - measure_export_size(objects)
+        print(f"材质去重完成：合并 {len(replace)} 个材质，导出文件减少 {bytes_saved} 字节")
     else:
-        target_obj.data.materials.append(material)
-    print("成功设置银色材质！")
+        print(f"材质去重完成：合并 {len(replace)} 个材质")
+    return len(replace), bytes_saved
 
 
 def main():
@@ -58,15 +227,17 @@ def main():
     model_path = "data/5.glb"  # 修改此处路径
 
     # 导入模型
-    target_obj = import_model(model_path)
-    if not target_obj:
+    imported_objects = import_model_objects(model_path)
+    if not imported_objects:
         return
 
-    # 设置材质
-    set_silver_material(target_obj)
+    # 设置材质，并清理被替换下来的旧材质
+    set_silver_material_batch(imported_objects)
+    removed = remove_unused_materials()
+    print(f"已删除 {removed} 个未使用的材质")
 
     print(f"处理完成：{model_path}")
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
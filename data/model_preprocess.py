@@ -93,8 +93,7 @@ class ModelProcessor:
                 bpy.ops.export_scene.obj(
                     filepath=export_path,
                     use_selection=True,
-                    use_materials=False,
-                    use_overwrite=True
+                    use_materials=False
                 )
             elif ext in ('glb', 'gltf'):
                 bpy.ops.export_scene.gltf(
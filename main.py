@@ -0,0 +1,54 @@
+import argparse
+import json
+import os
+
+from src.worker_daemon import DEFAULT_PORT, DEFAULT_SOCKET, JOBS, run_job, send_job
+
+# 只读取输入、不写输出文件的任务
+READ_ONLY_JOBS = {'info'}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="URDF-X 资产优化")
+    parser.add_argument('--input', required=True, help="输入模型或 URDF 文件")
+    parser.add_argument('--output', help="输出文件，lod 为输出目录（info 以外的任务必填）")
+    parser.add_argument('--job', default='optimize', choices=sorted(JOBS), help="任务类型")
+    parser.add_argument('--other', help="boolean：参与运算的第二个模型")
+    parser.add_argument('--operation', default='DIFFERENCE', choices=['DIFFERENCE', 'INTERSECT', 'UNION'],
+                        help="boolean：布尔运算类型")
+    parser.add_argument('--part-id', help="lod：部件编号；optimize 给出时在修复后导出 LOD 链")
+    parser.add_argument('--manifest', default='data/3d_part_information.json', help="部件清单路径")
+    parser.add_argument('--socket', default=DEFAULT_SOCKET, help="守护进程 Unix 套接字路径")
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT, help="守护进程本地 TCP 端口")
+    parser.add_argument('--local', action='store_true', help="不连接守护进程，在本进程中执行")
+    args = parser.parse_args()
+
+    if args.job not in READ_ONLY_JOBS and not args.output:
+        parser.error(f"任务 {args.job} 需要 --output")
+    if args.job == 'boolean' and not args.other:
+        parser.error("boolean 任务需要 --other")
+    if args.job == 'lod' and args.part_id is None:
+        parser.error("lod 任务需要 --part-id")
+
+    # 路径按调用方的工作目录解析，守护进程的工作目录可能不同
+    paths = {'input': args.input, 'output': args.output, 'other': args.other, 'manifest': args.manifest}
+    params = {k: os.path.abspath(v) for k, v in paths.items() if v is not None}
+    params.update({'operation': args.operation, 'part_id': args.part_id})
+    request = {'job': args.job, 'params': {k: v for k, v in params.items() if v is not None}}
+
+    if args.local:
+        response = run_job(request)
+    else:
+        try:
+            response = send_job(request, args.socket, args.port)
+        except OSError:
+            print("守护进程未启动，在本进程中执行")
+            response = run_job(request)
+
+    print(json.dumps(response, ensure_ascii=False, indent=2))
+    if not response.get('ok'):
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,457 @@
+import bpy
+import json
+import numpy as np
+from collections import defaultdict
+
+
+def load_cameras(camera_path):
+    """读取相机参数文件，返回按 frame_id 排列的相机位姿与内参"""
+    with open(camera_path, 'r', encoding='utf-8') as f:
+        params = json.load(f)
+
+    intrinsics = params['intrinsics']
+    width, height = intrinsics['resolution']
+    sensor_w, sensor_h = intrinsics['sensor_size']
+    focal = intrinsics['focal_length']
+
+    frames = sorted(params['camera_frames'], key=lambda c: c['frame_id'])
+    rotations = np.stack([euler_xyz_to_matrix(c['rotation']) for c in frames])
+    locations = np.array([c['location'] for c in frames], dtype=np.float64)
+
+    return {
+        'frame_ids': np.array([c['frame_id'] for c in frames], dtype=np.int32),
+        'rotations': rotations,  # 相机到世界 (V, 3, 3)
+        'locations': locations,  # 相机中心 (V, 3)
+        'fx': focal / sensor_w * width,
+        'fy': focal / sensor_h * height,
+        'width': int(width),
+        'height': int(height),
+        'model_matrix': np.array(params.get('scale_matrix', np.eye(4)), dtype=np.float64),
+    }
+
+
+def euler_xyz_to_matrix(rotation):
+    """Blender XYZ 欧拉角转旋转矩阵（R = Rz @ Ry @ Rx）"""
+    rx, ry, rz = rotation
+    cx, sx = np.cos(rx), np.sin(rx)
+    cy, sy = np.cos(ry), np.sin(ry)
+    cz, sz = np.cos(rz), np.sin(rz)
+    mat_x = np.array([[1, 0, 0], [0, cx, -sx], [0, sx, cx]])
+    mat_y = np.array([[cy, 0, sy], [0, 1, 0], [-sy, 0, cy]])
+    mat_z = np.array([[cz, -sz, 0], [sz, cz, 0], [0, 0, 1]])
+    return mat_z @ mat_y @ mat_x
+
+
+def select_cameras(cameras, frame_ids):
+    """按 frame_id 子集筛选相机（例如 segmentation_frames）"""
+    index = {int(fid): i for i, fid in enumerate(cameras['frame_ids'])}
+    rows = [index[int(fid)] for fid in frame_ids]
+    subset = dict(cameras)
+    subset['frame_ids'] = cameras['frame_ids'][rows]
+    subset['rotations'] = cameras['rotations'][rows]
+    subset['locations'] = cameras['locations'][rows]
+    return subset
+
+
+def project_points(points, cameras):
+    """
+    将点一次性投影到所有相机（批量矩阵运算）。
+    Blender 相机沿局部 -Z 观察，Y 轴朝上。
+    Returns:
+      u, v: 像素坐标 (V, N)，v 轴向下
+      depth: 相机前方距离 (V, N)，相机后方为负
+    """
+    points = np.asarray(points, dtype=np.float32)
+    rotations = cameras['rotations'].astype(np.float32)
+    locations = cameras['locations'].astype(np.float32)
+
+    # p_cam = R^T (p - t) = p @ R - t @ R
+    cam = np.matmul(points[None, :, :], rotations)
+    cam -= np.einsum('vj,vjk->vk', locations, rotations)[:, None, :]
+
+    depth = -cam[..., 2]
+    safe = np.where(depth > 1e-6, depth, np.float32(1e-6))
+    u = cameras['width'] * 0.5 + cameras['fx'] * cam[..., 0] / safe
+    v = cameras['height'] * 0.5 - cameras['fy'] * cam[..., 1] / safe
+    return u, v, depth
+
+
+def camera_view(cameras, view):
+    """取出单个相机（保留批量接口的数组形状）"""
+    single = dict(cameras)
+    single['frame_ids'] = cameras['frame_ids'][view:view + 1]
+    single['rotations'] = cameras['rotations'][view:view + 1]
+    single['locations'] = cameras['locations'][view:view + 1]
+    return single
+
+
+def compute_face_geometry(vertices, faces):
+    """根据三角面片计算面中心与单位法向"""
+    vertices = np.asarray(vertices, dtype=np.float32)
+    faces = np.asarray(faces, dtype=np.int64)
+    p0, p1, p2 = vertices[faces[:, 0]], vertices[faces[:, 1]], vertices[faces[:, 2]]
+    centroids = (p0 + p1 + p2) / 3.0
+    e1, e2 = p1 - p0, p2 - p0
+    normals = np.stack([e1[:, 1] * e2[:, 2] - e1[:, 2] * e2[:, 1],
+                        e1[:, 2] * e2[:, 0] - e1[:, 0] * e2[:, 2],
+                        e1[:, 0] * e2[:, 1] - e1[:, 1] * e2[:, 0]], axis=1)
+    lengths = np.sqrt(np.einsum('fk,fk->f', normals, normals))[:, None]
+    normals /= np.maximum(lengths, 1e-12)
+    return centroids, normals
+
+
+def _first_per_pixel(keys, shift):
+    """排序后保留每个像素的第一个片元（即深度最小者）"""
+    keys = np.sort(keys)
+    pixels = keys >> shift
+    first = np.ones(len(keys), dtype=bool)
+    first[1:] = pixels[1:] != pixels[:-1]
+    return keys[first]
+
+
+def rasterize_frame(u, v, depth, faces, width, height, mask=None, max_fragments=1 << 22):
+    """
+    将三角面光栅化到单帧深度缓冲（像素中心采样，透视校正深度）。
+    每个片元打包为 (像素, 量化深度, 面索引) 的 uint64 键，排序后取每像素首个即为最近面。
+    mask 为 False 的面不参与光栅化（例如背面）。
+    Returns:
+      zbuf: 每像素最近深度 (H*W,)，无覆盖为 inf
+      owner: 每像素最近的三角面索引 (H*W,)，无覆盖为 -1
+    """
+    faces = np.asarray(faces, dtype=np.int64)
+    num_faces = len(faces)
+    zbuf = np.full(width * height, np.inf, dtype=np.float32)
+    owner = np.full(width * height, -1, dtype=np.int64)
+
+    # 先按掩码筛出参与光栅化的面，后续只处理这些面
+    candidates = np.flatnonzero(mask) if mask is not None else np.arange(num_faces)
+    faces = faces[candidates]
+
+    x0, x1, x2 = u[faces[:, 0]], u[faces[:, 1]], u[faces[:, 2]]
+    y0, y1, y2 = v[faces[:, 0]], v[faces[:, 1]], v[faces[:, 2]]
+
+    # 覆盖的像素中心范围 (i + 0.5)；跨越相机平面的三角面无法正确投影，直接跳过
+    px0 = np.maximum(np.ceil(np.minimum(np.minimum(x0, x1), x2) - 0.5), 0).astype(np.int32)
+    px1 = np.minimum(np.floor(np.maximum(np.maximum(x0, x1), x2) - 0.5), width - 1).astype(np.int32)
+    py0 = np.maximum(np.ceil(np.minimum(np.minimum(y0, y1), y2) - 0.5), 0).astype(np.int32)
+    py1 = np.minimum(np.floor(np.maximum(np.maximum(y0, y1), y2) - 0.5), height - 1).astype(np.int32)
+    nx = np.maximum(px1 - px0 + 1, 0)
+    count = nx * np.maximum(py1 - py0 + 1, 0)
+    near_ok = np.minimum(np.minimum(depth[faces[:, 0]], depth[faces[:, 1]]), depth[faces[:, 2]]) > 1e-4
+    count[~near_ok] = 0
+
+    # 只为覆盖像素中心的面计算系数
+    sel = np.flatnonzero(count)
+    if not len(sel):
+        return zbuf, owner
+    x0, y0 = x0[sel], y0[sel]
+    e1x, e1y = x1[sel] - x0, y1[sel] - y0
+    e2x, e2y = x2[sel] - x0, y2[sel] - y0
+    area = e1x * e2y - e2x * e1y
+    degenerate = np.abs(area) < 1e-12
+    inv_area = np.where(degenerate, 0.0, 1.0 / np.where(degenerate, 1.0, area)).astype(np.float32)
+
+    # 以第一个顶点为原点的重心坐标与 1/z 都是像素偏移的线性函数
+    iz0 = 1.0 / depth[faces[sel, 0]]
+    k1 = 1.0 / depth[faces[sel, 1]] - iz0
+    k2 = 1.0 / depth[faces[sel, 2]] - iz0
+    a1, b1 = e2y * inv_area, -e2x * inv_area
+    a2, b2 = -e1y * inv_area, e1x * inv_area
+    coef = np.stack([x0, y0, a1, b1, a2, b2, iz0, k1 * a1 + k2 * a2, k1 * b1 + k2 * b2], axis=1)
+    coef[degenerate, 2:6] = np.nan  # 退化面不产生片元
+
+    # 键的位宽：像素 | 深度 | 面索引
+    id_bits = max(int(num_faces).bit_length(), 1)
+    pixel_bits = int(width * height - 1).bit_length()
+    depth_bits = 64 - id_bits - pixel_bits
+    if depth_bits < 12:
+        raise ValueError(f"面数过多，无法打包深度键: {num_faces}")
+    depth_levels = float((1 << depth_bits) - 1)
+    used_depth = depth[faces[sel]]
+    near, far = float(used_depth.min()), float(used_depth.max())
+    depth_scale = depth_levels / max(far - near, 1e-12)
+    shift = np.uint64(depth_bits + id_bits)
+
+    def shade(local, col, row):
+        """片元内外测试与深度插值，返回该批片元中每像素最近者的键"""
+        k = coef[local]
+        dx = (col + 0.5).astype(np.float32) - k[:, 0]
+        dy = (row + 0.5).astype(np.float32) - k[:, 1]
+        w1 = k[:, 2] * dx + k[:, 3] * dy
+        w2 = k[:, 4] * dx + k[:, 5] * dy
+        inside = (w1 >= -1e-6) & (w2 >= -1e-6) & (w1 + w2 <= 1.0 + 1e-6)
+        k, dx, dy = k[inside], dx[inside], dy[inside]
+        frag_depth = 1.0 / (k[:, 6] + k[:, 7] * dx + k[:, 8] * dy)
+        quantized = np.clip((frag_depth - near) * depth_scale, 0, depth_levels).astype(np.uint64)
+        pixels = row[inside].astype(np.uint64) * np.uint64(width) + col[inside].astype(np.uint64)
+        keys = (pixels << shift) | (quantized << np.uint64(id_bits)) | candidates[sel[local[inside]]].astype(np.uint64)
+        return _first_per_pixel(keys, shift)
+
+    # 亚像素网格中大部分面只覆盖一个像素中心，单独走快速路径
+    sel_count = count[sel]
+    winners = []
+    single = np.flatnonzero(sel_count == 1)
+    if len(single):
+        winners.append(shade(single, px0[sel[single]], py0[sel[single]]))
+
+    multi = np.flatnonzero(sel_count > 1)
+    cumulative = np.cumsum(sel_count[multi], dtype=np.int64)
+    start = 0
+    while start < len(multi):
+        base = cumulative[start - 1] if start else 0
+        stop = max(int(np.searchsorted(cumulative, base + max_fragments, side='right')), start + 1)
+        local = multi[start:stop]
+        start = stop
+        n = sel_count[local]
+        rep = np.repeat(local, n)
+        offset = np.arange(int(n.sum()), dtype=np.int32) - np.repeat((np.cumsum(n) - n).astype(np.int32), n)
+        span = nx[sel[rep]]
+        row_offset = offset // span
+        winners.append(shade(rep, px0[sel[rep]] + offset - row_offset * span, py0[sel[rep]] + row_offset))
+
+    keys = _first_per_pixel(np.concatenate(winners), shift)
+    pixels = (keys >> shift).astype(np.int64)
+    ids = (keys & np.uint64((1 << id_bits) - 1)).astype(np.int64)
+    owner[pixels] = ids
+    zbuf[pixels] = near + ((keys >> np.uint64(id_bits)) & np.uint64((1 << depth_bits) - 1)) / depth_scale
+    return zbuf, owner
+
+
+def iter_visibility(vertices, faces, cameras, pixel_tolerance=2.0, cull_backfaces=True):
+    """
+    逐帧计算三角面可见性，避免 V×F 的中间数组。
+    面在某帧可见需满足：正对相机，且在光栅化结果中占有至少一个像素，
+    或（亚像素面）其中心深度不超过该像素最近深度加容差。
+    容差按像素在该深度处的尺寸与法向倾斜程度缩放。
+    cull_backfaces 时背面不写入深度缓冲：对封闭网格（connectivity 修复后）
+    沿视线的第一个交点必为正面，结果不变；开放网格需传 False。
+    Yields:
+      view, visible (F,), u (F,), v (F,), facing (F,),
+      owns_pixel (F,)：可见性由像素归属直接确定的面，其余可见面仅通过深度容差判定
+    """
+    vertices = np.asarray(vertices, dtype=np.float32)
+    faces = np.asarray(faces, dtype=np.int64)
+    centroids, normals = compute_face_geometry(vertices, faces)
+    width, height = cameras['width'], cameras['height']
+
+    # 朝向只需每帧一次矩阵向量乘：n·(t - c) = n·t - n·c
+    normal_dot_centroid = np.einsum('fk,fk->f', normals, centroids)
+    normal_dot_corner = np.einsum('fk,fk->f', normals, vertices[faces[:, 0]])
+    centroid_sq = np.einsum('fk,fk->f', centroids, centroids)
+
+    for view in range(len(cameras['frame_ids'])):
+        single = camera_view(cameras, view)
+        location = single['locations'][0].astype(np.float32)
+        vu, vv, vz = project_points(vertices, single)
+        normal_dot_location = normals @ location
+        front = normal_dot_location > normal_dot_corner if cull_backfaces else None
+        zbuf, owner = rasterize_frame(vu[0], vv[0], vz[0], faces, width, height, front)
+
+        cu, cv, cz = project_points(centroids, single)
+        cu, cv, cz = cu[0], cv[0], cz[0]
+        distance = np.sqrt(np.maximum(centroid_sq - 2.0 * (centroids @ location) + location @ location, 1e-24))
+        facing = (normal_dot_location - normal_dot_centroid) / distance
+
+        col = cu.astype(np.int32)
+        row = cv.astype(np.int32)
+        on_screen = (cz > 0) & (cu >= 0) & (cu < width) & (cv >= 0) & (cv < height)
+        nearest = zbuf[np.where(on_screen, row * width + col, 0)]
+
+        cos = np.clip(facing, 0.1, 1.0)
+        tolerance = pixel_tolerance * (cz / cameras['fx']) * (np.sqrt(1.0 - cos * cos) / cos + 0.1)
+
+        owns_pixel = np.zeros(len(faces), dtype=bool)
+        owns_pixel[owner[owner >= 0]] = True
+        owns_pixel &= facing > 0
+        visible = owns_pixel | ((facing > 0) & on_screen & (cz <= nearest + tolerance))
+        yield view, visible, cu, cv, facing, owns_pixel
+
+
+def compute_visibility(vertices, faces, cameras, pixel_tolerance=2.0, cull_backfaces=True):
+    """所有帧的三角面可见性矩阵 (V, F)"""
+    visible = np.zeros((len(cameras['frame_ids']), len(faces)), dtype=bool)
+    views = iter_visibility(vertices, faces, cameras, pixel_tolerance, cull_backfaces)
+    for view, frame_visible, _, _, _, _ in views:
+        visible[view] = frame_visible
+    return visible
+
+
+def load_detections(info_path):
+    """读取 2D 检测信息，按帧分组并返回分割帧列表"""
+    with open(info_path, 'r', encoding='utf-8') as f:
+        info = json.load(f)
+
+    detections = defaultdict(list)
+    for det in info.get('detection', []):
+        detections[int(det['frame_id'])].append(det)
+
+    frames = info.get('segmentation_frames') or sorted(detections)
+    return detections, [int(fid) for fid in frames]
+
+
+def _given_visibility(vertices, faces, cameras, visibility):
+    """使用预先计算的可见性，只补算投影坐标与朝向"""
+    centroids, normals = compute_face_geometry(vertices, faces)
+    for view in range(len(cameras['frame_ids'])):
+        single = camera_view(cameras, view)
+        cu, cv, _ = project_points(centroids, single)
+        view_dirs = single['locations'][0].astype(np.float32) - centroids
+        view_dirs /= np.maximum(np.linalg.norm(view_dirs, axis=1, keepdims=True), 1e-12)
+        facing = np.einsum('fk,fk->f', view_dirs, normals)
+        yield view, np.asarray(visibility[view], dtype=bool), cu[0], cv[0], facing, None
+
+
+def label_faces(vertices, faces, cameras, detections, frame_ids, masks=None,
+                visibility=None, groups=None, num_groups=None, pixel_tolerance=2.0,
+                cull_backfaces=True):
+    """
+    多视角反投影：将各帧检测结果投票到网格面上。
+    Args:
+      faces: 三角面 (F, 3)
+      detections: {frame_id: [detection, ...]}
+      frame_ids: 参与投票的帧（segmentation_frames）
+      masks: 可选 {(frame_id, object_id): bool 掩码 (H, W)}，缺省时使用检测框
+      visibility: 可选，预先计算的可见性 (len(frame_ids), F)
+      groups: 可选，每个三角面所属的多边形索引，票数按多边形汇总
+      cull_backfaces: 开放网格传 False，背面也参与遮挡
+    Returns:
+      labels: 每个面（或多边形）的 object_id，无投票为 -1
+      scores: 获胜标签占该面总票数的比例
+      names: {object_id: label}
+    """
+    cameras = select_cameras(cameras, frame_ids)
+    masks = masks or {}
+
+    if visibility is None:
+        views = iter_visibility(vertices, faces, cameras, pixel_tolerance, cull_backfaces)
+    else:
+        views = _given_visibility(vertices, faces, cameras, visibility)
+
+    object_ids = sorted({int(d['object_id']) for fid in frame_ids for d in detections.get(fid, [])})
+    columns = {oid: i for i, oid in enumerate(object_ids)}
+    names = {int(d['object_id']): d['label'] for fid in frame_ids for d in detections.get(fid, [])}
+
+    num_faces = len(faces)
+    votes = np.zeros((num_faces, max(len(object_ids), 1)), dtype=np.float32)
+
+    for view, visible, u, v, facing, _ in views:
+        frame_dets = detections.get(frame_ids[view], [])
+        if not frame_dets:
+            continue
+        idx = np.flatnonzero(visible)
+        fu, fv = u[idx], v[idx]
+        # 正对相机的面权重更高
+        weight = np.clip(facing[idx], 0.0, 1.0)
+
+        for det in frame_dets:
+            oid = int(det['object_id'])
+            mask = masks.get((frame_ids[view], oid))
+            if mask is not None:
+                col = np.clip(fu.astype(np.int64), 0, mask.shape[1] - 1)
+                row = np.clip(fv.astype(np.int64), 0, mask.shape[0] - 1)
+                hit = mask[row, col]
+            else:
+                x0, y0, x1, y1 = det['box']
+                hit = (fu >= x0) & (fu <= x1) & (fv >= y0) & (fv <= y1)
+            votes[idx[hit], columns[oid]] += float(det['confidence']) * weight[hit]
+
+    if groups is not None:
+        grouped = np.zeros((num_groups, votes.shape[1]), dtype=np.float32)
+        np.add.at(grouped, np.asarray(groups, dtype=np.int64), votes)
+        votes = grouped
+
+    total = votes.sum(axis=1)
+    best = votes.argmax(axis=1)
+    ids = np.array(object_ids or [-1], dtype=np.int32)
+    labels = np.where(total > 0, ids[best], -1).astype(np.int32)
+    scores = np.where(total > 0, votes[np.arange(len(votes)), best] / np.maximum(total, 1e-12), 0.0)
+    return labels, scores.astype(np.float32), names
+
+
+def get_mesh_arrays(obj):
+    """读取网格的世界坐标顶点、三角面及其所属多边形（foreach_get 批量读取）"""
+    mesh = obj.data
+    mesh.calc_loop_triangles()
+    matrix = np.array(obj.matrix_world, dtype=np.float32)
+
+    vertices = np.empty(len(mesh.vertices) * 3, dtype=np.float32)
+    mesh.vertices.foreach_get('co', vertices)
+    faces = np.empty(len(mesh.loop_triangles) * 3, dtype=np.int32)
+    mesh.loop_triangles.foreach_get('vertices', faces)
+    polygon_index = np.empty(len(mesh.loop_triangles), dtype=np.int32)
+    mesh.loop_triangles.foreach_get('polygon_index', polygon_index)
+
+    vertices = vertices.reshape(-1, 3) @ matrix[:3, :3].T + matrix[:3, 3]
+    return vertices, faces.reshape(-1, 3).astype(np.int64), polygon_index
+
+
+def get_scene_arrays(objects):
+    """
+    合并多个网格对象的三角面，使各部件之间互相遮挡
+    Returns:
+      vertices, faces, groups: 合并后的数组，groups 为全局多边形编号
+      offsets: 每个对象多边形编号的起点（长度为对象数 + 1），用于拆分标签
+    """
+    all_vertices, all_faces, all_groups = [], [], []
+    offsets = [0]
+    vertex_offset = 0
+    for obj in objects:
+        vertices, faces, polygon_index = get_mesh_arrays(obj)
+        all_vertices.append(vertices)
+        all_faces.append(faces + vertex_offset)
+        all_groups.append(polygon_index + offsets[-1])
+        vertex_offset += len(vertices)
+        offsets.append(offsets[-1] + len(obj.data.polygons))
+    return (np.concatenate(all_vertices), np.concatenate(all_faces),
+            np.concatenate(all_groups), offsets)
+
+
+def apply_model_matrix(points, matrix):
+    """用齐次矩阵变换点（例如相机参数中的 scale_matrix）"""
+    matrix = np.asarray(matrix, dtype=np.float32)
+    return np.asarray(points, dtype=np.float32) @ matrix[:3, :3].T + matrix[:3, 3]
+
+
+def write_face_labels(obj, labels, attribute_name="part_label"):
+    """将面标签写入网格的 FACE 整型属性，供后续拆分部件使用"""
+    mesh = obj.data
+    attribute = mesh.attributes.get(attribute_name)
+    if attribute is None:
+        attribute = mesh.attributes.new(name=attribute_name, type='INT', domain='FACE')
+    attribute.data.foreach_set('value', np.asarray(labels, dtype=np.int32))
+    mesh.update()
+
+
+def main():
+    # 直接指定路径（无需命令行参数）
+    model_path = "data/5.glb"
+    camera_path = "models/camera_parameters.json"
+    info_path = "data/2d_information.json"
+
+    bpy.ops.object.select_all(action='DESELECT')
+    bpy.ops.import_scene.gltf(filepath=model_path)
+    mesh_objects = [obj for obj in bpy.context.selected_objects if obj.type == 'MESH']
+    if not mesh_objects:
+        print("错误：导入失败，未找到网格对象！")
+        return
+
+    cameras = load_cameras(camera_path)
+    detections, frame_ids = load_detections(info_path)
+
+    # 所有对象一起光栅化，相邻部件之间的遮挡才会生效
+    vertices, faces, groups, offsets = get_scene_arrays(mesh_objects)
+    vertices = apply_model_matrix(vertices, cameras['model_matrix'])
+    all_labels, scores, names = label_faces(vertices, faces, cameras, detections, frame_ids,
+                                            groups=groups, num_groups=offsets[-1])
+
+    for i, obj in enumerate(mesh_objects):
+        labels = all_labels[offsets[i]:offsets[i + 1]]
+        write_face_labels(obj, labels)
+
+        print(f"对象 {obj.name}: {len(labels)} 个面，已标注 {int((labels >= 0).sum())} 个")
+        for oid, name in names.items():
+            print(f"  - {oid} ({name}): {int((labels == oid).sum())} 个面")
+
+
+if __name__ == "__main__":
+    main()
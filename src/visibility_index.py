@@ -0,0 +1,179 @@
+import bpy
+import hashlib
+import os
+import numpy as np
+from mathutils import Vector
+from mathutils.bvhtree import BVHTree
+
+from src.face_labeling import (load_cameras, iter_visibility, compute_face_geometry,
+                               get_scene_arrays, apply_model_matrix)
+
+INDEX_VERSION = 2
+
+
+def mesh_content_hash(vertices, faces, camera_path, method, cull_backfaces):
+    """网格内容哈希：顶点、三角面、相机文件和构建参数任一变化即失效"""
+    digest = hashlib.sha1()
+    digest.update(f"v{INDEX_VERSION}:{method}:{int(cull_backfaces)}".encode())
+    digest.update(np.ascontiguousarray(vertices, dtype=np.float32).tobytes())
+    digest.update(np.ascontiguousarray(faces, dtype=np.int32).tobytes())
+    with open(camera_path, 'rb') as f:
+        digest.update(f.read())
+    return digest.hexdigest()
+
+
+class VisibilityIndex:
+    """每帧可见三角面（get_scene_arrays 的三角化结果）的位集索引，查询只需查表"""
+
+    def __init__(self, frame_ids, bits, num_faces, mesh_hash):
+        self.frame_ids = np.asarray(frame_ids, dtype=np.int32)
+        self.bits = bits  # (V, ceil(F / 8)) uint8，little 位序
+        self.num_faces = int(num_faces)
+        self.mesh_hash = mesh_hash
+        self._rows = {int(fid): i for i, fid in enumerate(self.frame_ids)}
+
+    @classmethod
+    def from_matrix(cls, frame_ids, visible, mesh_hash):
+        bits = np.packbits(np.asarray(visible, dtype=bool), axis=1, bitorder='little')
+        return cls(frame_ids, bits, visible.shape[1], mesh_hash)
+
+    def is_visible(self, frame_id, faces):
+        """查询给定面在某帧中是否可见"""
+        faces = np.asarray(faces, dtype=np.int64)
+        row = self.bits[self._rows[int(frame_id)]]
+        return ((row[faces >> 3] >> (faces & 7)) & 1).astype(bool)
+
+    def visible_mask(self, frame_id):
+        """某帧的可见面布尔掩码 (F,)"""
+        row = self.bits[self._rows[int(frame_id)]]
+        return np.unpackbits(row, count=self.num_faces, bitorder='little').astype(bool)
+
+    def visible_faces(self, frame_id):
+        """某帧可见面的索引"""
+        return np.flatnonzero(self.visible_mask(frame_id))
+
+    def visibility_matrix(self, frame_ids=None):
+        """按帧顺序展开为 (V, F) 布尔矩阵，可直接传给 label_faces"""
+        if frame_ids is None:
+            frame_ids = self.frame_ids
+        rows = self.bits[[self._rows[int(fid)] for fid in frame_ids]]
+        return np.unpackbits(rows, axis=1, count=self.num_faces, bitorder='little').astype(bool)
+
+    def frames_seeing(self, face):
+        """能看到某个面的所有帧"""
+        face = int(face)
+        hit = (self.bits[:, face >> 3] >> (face & 7)) & 1
+        return self.frame_ids[hit.astype(bool)]
+
+    def coverage(self, frame_ids=None):
+        """被至少一帧看到的面所占比例"""
+        if frame_ids is None:
+            frame_ids = self.frame_ids
+        rows = self.bits[[self._rows[int(fid)] for fid in frame_ids]]
+        seen = np.bitwise_or.reduce(rows, axis=0)
+        return int(np.unpackbits(seen, count=self.num_faces, bitorder='little').sum()) / max(self.num_faces, 1)
+
+    def save(self, path):
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        np.savez_compressed(path, frame_ids=self.frame_ids, bits=self.bits,
+                            num_faces=self.num_faces, mesh_hash=self.mesh_hash)
+
+    @classmethod
+    def load(cls, path, mesh_hash=None):
+        """读取缓存；哈希不一致时返回 None"""
+        if not os.path.exists(path):
+            return None
+        data = np.load(path)
+        if mesh_hash is not None and str(data['mesh_hash']) != mesh_hash:
+            return None
+        return cls(data['frame_ids'], data['bits'], int(data['num_faces']), str(data['mesh_hash']))
+
+
+def _ray_cast_faces(tree, location, centroids, faces):
+    """从相机中心向面中心发射光线，首个交点为该面（或不早于该面）即可见"""
+    origin = Vector(location)
+    visible = np.zeros(len(faces), dtype=bool)
+    for i, face in enumerate(faces.tolist()):
+        direction = Vector(centroids[face]) - origin
+        distance = direction.length
+        _, _, index, hit_distance = tree.ray_cast(origin, direction.normalized(), distance * 1.001)
+        visible[i] = index is None or index == face or hit_distance >= distance * 0.9999
+    return visible
+
+
+def build_visibility_index(vertices, faces, cameras, mesh_hash, method='bvh', cull_backfaces=True):
+    """
+    对所有相机帧构建一次可见性索引。
+    raster: 逐帧光栅化三角面得到像素归属，占有像素的面可见、被完全覆盖的面不可见；
+            不覆盖任何像素中心的亚像素面按渲染深度加容差判定。
+    bvh:    在 raster 结果基础上，只对亚像素且仅靠深度容差判为可见的面做 BVH 光线求交，
+            结果精确，耗时取决于亚像素面数量。索引只构建一次并缓存，默认使用 bvh。
+    """
+    if method not in ('raster', 'bvh'):
+        raise ValueError(f"不支持的可见性计算方式: {method}")
+
+    tree = None
+    if method == 'bvh':
+        centroids, _ = compute_face_geometry(vertices, faces)
+        tree = BVHTree.FromPolygons(vertices.tolist(), faces.tolist(), all_triangles=True)
+
+    visible = np.zeros((len(cameras['frame_ids']), len(faces)), dtype=bool)
+    for view, frame_visible, _, _, _, owns_pixel in iter_visibility(
+            vertices, faces, cameras, cull_backfaces=cull_backfaces):
+        if tree is not None:
+            ambiguous = np.flatnonzero(frame_visible & ~owns_pixel)
+            frame_visible[ambiguous] = _ray_cast_faces(tree, cameras['locations'][view], centroids, ambiguous)
+        visible[view] = frame_visible
+    return VisibilityIndex.from_matrix(cameras['frame_ids'], visible, mesh_hash)
+
+
+def load_or_build_index(objects, camera_path, cache_path, method='bvh', cull_backfaces=True):
+    """
+    按网格内容哈希读取缓存，失效时重建并写回。
+    多个对象合并为一个索引（面按对象顺序拼接），部件之间的遮挡才会生效
+    """
+    cameras = load_cameras(camera_path)
+    vertices, faces, _, _ = get_scene_arrays(objects)
+    vertices = apply_model_matrix(vertices, cameras['model_matrix'])
+
+    mesh_hash = mesh_content_hash(vertices, faces, camera_path, method, cull_backfaces)
+    index = VisibilityIndex.load(cache_path, mesh_hash)
+    if index is not None:
+        print(f"使用可见性缓存：{cache_path}")
+        return index
+
+    index = build_visibility_index(vertices, faces, cameras, mesh_hash, method, cull_backfaces)
+    index.save(cache_path)
+    print(f"可见性索引已写入：{cache_path}")
+    return index
+
+
+def main():
+    # 直接指定路径（无需命令行参数）
+    model_path = "data/5.glb"
+    camera_path = "models/camera_parameters.json"
+    cache_dir = "data/visibility"
+
+    bpy.ops.object.select_all(action='DESELECT')
+    bpy.ops.import_scene.gltf(filepath=model_path)
+    mesh_objects = [obj for obj in bpy.context.selected_objects if obj.type == 'MESH']
+    if not mesh_objects:
+        print("错误：导入失败，未找到网格对象！")
+        return
+
+    name = os.path.splitext(os.path.basename(model_path))[0]
+    cache_path = os.path.join(cache_dir, f"{name}.npz")
+    index = load_or_build_index(mesh_objects, camera_path, cache_path)
+    print(f"模型 {name}: {index.num_faces} 个面，覆盖率 {index.coverage():.1%}")
+
+    # 按对象拆分统计（三角面按对象顺序拼接）
+    offsets = np.cumsum([0] + [len(obj.data.loop_triangles) for obj in mesh_objects])
+    for i, obj in enumerate(mesh_objects):
+        print(f"对象 {obj.name}: {offsets[i + 1] - offsets[i]} 个面")
+        for fid in index.frame_ids:
+            visible = index.visible_mask(fid)[offsets[i]:offsets[i + 1]]
+            print(f"  帧 {int(fid)}: 可见 {int(visible.sum())} 个面")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,283 @@
+import argparse
+import json
+import multiprocessing
+import os
+import shutil
+import socket
+import socketserver
+import threading
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+DEFAULT_SOCKET = "/tmp/urdfx.sock"
+DEFAULT_PORT = 8765
+
+
+def _preload():
+    """工作进程初始化：一次性导入 bpy / numpy / scipy 及各处理模块"""
+    import bpy
+    import numpy
+    import scipy.spatial
+
+    # 预先导入各处理模块，避免首个任务承担导入开销
+    import data.model_preprocess
+    import utils.connectivity
+    import utils.bool_2_mesh
+    import utils.multi_separate
+    import utils.lod_pyramid
+    import asset.color_changer
+    print(f"工作进程 {os.getpid()} 已就绪")
+
+
+def _reset_scene():
+    """每个任务开始前重置 Blender 场景"""
+    import bpy
+    bpy.ops.wm.read_factory_settings(use_empty=True)
+
+
+def _copy_input(params):
+    """将输入复制到输出路径（必须显式给出，main.py 已转为绝对路径），处理函数均为原地修改"""
+    source = params['input']
+    output = params['output']
+    if output != source:
+        os.makedirs(os.path.dirname(output) or '.', exist_ok=True)
+        shutil.copyfile(source, output)
+    return output
+
+
+def job_preprocess(params):
+    """尺寸标准化 + 旋转（data/model_preprocess.py）"""
+    from data.model_preprocess import ModelProcessor
+    output = _copy_input(params)
+    ModelProcessor({'model_path': output}).process()
+    return {'output': output}
+
+
+def job_repair(params):
+    """孔洞与连通性修复（utils/connectivity.py）"""
+    from utils.connectivity import repair_file
+    return repair_file(params['input'], params.get('output'))
+
+
+def job_boolean(params):
+    """布尔运算（utils/bool_2_mesh.py）"""
+    from utils.bool_2_mesh import boolean_files
+    return boolean_files(params.get('target') or params['input'], params['other'],
+                         params.get('operation', 'DIFFERENCE'), params['output'])
+
+
+def job_info(params):
+    """导出模型对象信息（utils/multi_separate.py）"""
+    from utils.multi_separate import ModelProcessor
+    processor = ModelProcessor({'model_path': params['input']})
+    processor._clear_scene()
+    processor._load_model()
+    return {'objects': processor.collect_objects_info()}
+
+
+def job_materials(params):
+    """材质去重并导出（asset/color_changer.py）"""
+    from asset.color_changer import (deduplicate_materials, export_model, import_model_objects,
+                                     measure_export_size)
+    objects = import_model_objects(params['input'])
+    if not objects:
+        raise RuntimeError(f"导入失败: {params['input']}")
+    # 测量只多导出一次（去重前），去重后的大小直接取本任务的最终输出
+    measure = params.get('measure', False)
+    size_before = measure_export_size(objects, os.path.splitext(params['output'])[1]) if measure else None
+    collapsed, _ = deduplicate_materials(objects)
+    export_model(objects, params['output'])
+    bytes_saved = size_before - os.path.getsize(params['output']) if measure else None
+    return {'output': params['output'], 'collapsed': collapsed, 'bytes_saved': bytes_saved}
+
+
+def job_lod(params):
+    """LOD 链导出并写入部件清单（utils/lod_pyramid.py）"""
+    import bpy
+    from utils.lod_pyramid import DEFAULT_RATIOS, export_lod_chain
+    ext = params['input'].split('.')[-1].lower()
+    import_func = {
+        'obj': bpy.ops.import_scene.obj,
+        'glb': bpy.ops.import_scene.gltf,
+        'fbx': bpy.ops.import_scene.fbx
+    }.get(ext, None)
+    if not import_func:
+        raise ValueError(f"不支持的格式: {ext}")
+    import_func(filepath=params['input'])
+    meshes = [o for o in bpy.context.selected_objects if o.type == 'MESH']
+    if not meshes:
+        raise RuntimeError(f"导入失败: {params['input']}")
+    # 多网格模型先合并，与 data/model_preprocess.py 的 _load_model 一致
+    bpy.context.view_layer.objects.active = meshes[0]
+    if len(meshes) > 1:
+        bpy.ops.object.select_all(action='DESELECT')
+        for mesh in meshes:
+            mesh.select_set(True)
+        bpy.ops.object.join()
+    obj = bpy.context.view_layer.objects.active
+    entries = export_lod_chain(obj, params['part_id'], params.get('output') or 'data/lod',
+                               params.get('manifest', 'data/3d_part_information.json'),
+                               tuple(params.get('ratios', DEFAULT_RATIOS)))
+    return {'lod': entries}
+
+
+def job_optimize(params):
+    """main.py 默认流程：标准化后对 OBJ 进行拓扑修复；给出 part_id 时接着导出 LOD 链"""
+    result = job_preprocess(params)
+    output = result['output']
+    if output.lower().endswith('.obj'):
+        _reset_scene()
+        result['repair'] = job_repair({'input': output})
+    if params.get('part_id') is not None:
+        _reset_scene()
+        lod_params = {'input': output, 'part_id': params['part_id'],
+                      'output': params.get('lod_dir') or os.path.join(os.path.dirname(output), 'lod')}
+        if 'manifest' in params:
+            lod_params['manifest'] = params['manifest']
+        result.update(job_lod(lod_params))
+    return result
+
+
+JOBS = {
+    'preprocess': job_preprocess,
+    'repair': job_repair,
+    'boolean': job_boolean,
+    'info': job_info,
+    'materials': job_materials,
+    'lod': job_lod,
+    'optimize': job_optimize,
+}
+
+
+def run_job(request):
+    """执行单个任务，返回可 JSON 序列化的响应"""
+    start = time.perf_counter()
+    name = request.get('job')
+    try:
+        if name not in JOBS:
+            raise ValueError(f"不支持的任务类型: {name}")
+        _reset_scene()
+        result = JOBS[name](request.get('params', {}))
+        return {'ok': True, 'job': name, 'result': result,
+                'elapsed': time.perf_counter() - start}
+    except Exception as e:
+        return {'ok': False, 'job': name, 'error': str(e),
+                'traceback': traceback.format_exc(),
+                'elapsed': time.perf_counter() - start}
+
+
+def _make_pool(workers):
+    """创建工作进程池并提前拉起全部进程，使首个任务不承担启动开销"""
+    # bpy 不支持 fork 后复用，使用 spawn 启动工作进程
+    context = multiprocessing.get_context('spawn')
+    pool = ProcessPoolExecutor(max_workers=workers, mp_context=context, initializer=_preload)
+    for future in [pool.submit(os.getpid) for _ in range(workers)]:
+        future.result()
+    return pool
+
+
+def _restart_pool(server, broken):
+    """工作进程崩溃（如 bpy 段错误）后重建进程池；多个连接同时发现时只重建一次"""
+    with server.pool_lock:
+        if server.pool is not broken:
+            return
+        print("警告：工作进程异常退出，正在重建进程池")
+        broken.shutdown(wait=False, cancel_futures=True)
+        server.pool = _make_pool(server.workers)
+        print("进程池已重建")
+
+
+class _JobHandler(socketserver.StreamRequestHandler):
+    """每个连接读取一行 JSON 请求，返回一行 JSON 响应"""
+
+    def handle(self):
+        line = self.rfile.readline()
+        if not line:
+            return
+        pool = self.server.pool
+        try:
+            request = json.loads(line)
+            response = pool.submit(run_job, request).result()
+        except BrokenProcessPool:
+            _restart_pool(self.server, pool)
+            response = {'ok': False, 'error': "工作进程崩溃，任务未完成；进程池已重建，可重新提交"}
+        except Exception as e:
+            response = {'ok': False, 'error': str(e)}
+        self.wfile.write((json.dumps(response) + "\n").encode('utf-8'))
+
+
+def _socket_in_use(socket_path):
+    """套接字文件是否仍由存活的守护进程监听"""
+    probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        probe.connect(socket_path)
+        return True
+    except OSError:
+        return False
+    finally:
+        probe.close()
+
+
+def _make_server(socket_path, port):
+    """优先使用 Unix 套接字，不支持时退回本地 TCP"""
+    if socket_path and hasattr(socket, 'AF_UNIX'):
+        if os.path.exists(socket_path):
+            if _socket_in_use(socket_path):
+                raise RuntimeError(f"已有守护进程在监听: {socket_path}")
+            # 上次异常退出遗留的套接字文件
+            os.remove(socket_path)
+        server = socketserver.ThreadingUnixStreamServer(socket_path, _JobHandler)
+        print(f"守护进程监听 Unix 套接字：{socket_path}")
+    else:
+        server = socketserver.ThreadingTCPServer(('127.0.0.1', port), _JobHandler)
+        print(f"守护进程监听 127.0.0.1:{port}")
+    server.daemon_threads = True
+    return server
+
+
+def send_job(request, socket_path=DEFAULT_SOCKET, port=DEFAULT_PORT, timeout=None):
+    """客户端：向守护进程发送任务并等待结果"""
+    if socket_path and hasattr(socket, 'AF_UNIX'):
+        conn = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        address = socket_path
+    else:
+        conn = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        address = ('127.0.0.1', port)
+    conn.settimeout(timeout)
+    with conn:
+        conn.connect(address)
+        conn.sendall((json.dumps(request) + "\n").encode('utf-8'))
+        with conn.makefile('rb') as reader:
+            return json.loads(reader.readline())
+
+
+def serve(socket_path=DEFAULT_SOCKET, port=DEFAULT_PORT, workers=2):
+    """启动守护进程：工作进程池预加载依赖，常驻等待任务"""
+    server = _make_server(socket_path, port)
+    server.workers = workers
+    server.pool_lock = threading.Lock()
+    server.pool = _make_pool(workers)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("守护进程退出")
+    finally:
+        server.server_close()
+        server.pool.shutdown()
+        if socket_path and hasattr(socket, 'AF_UNIX') and os.path.exists(socket_path):
+            os.remove(socket_path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="URDF-X 常驻工作进程")
+    parser.add_argument('--socket', default=DEFAULT_SOCKET, help="Unix 套接字路径，置空则使用 TCP")
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT, help="本地 TCP 端口")
+    parser.add_argument('--workers', type=int, default=2, help="工作进程数量")
+    args = parser.parse_args()
+    serve(args.socket, args.port, args.workers)
+
+
+if __name__ == "__main__":
+    main()
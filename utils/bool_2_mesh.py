@@ -74,6 +74,19 @@ def save_model(obj, filepath):
     )
 
 
+def boolean_files(target_path, other_path, operation_type, output_path):
+    """对两个模型文件执行布尔运算并保存结果，返回体积信息"""
+    target = load_model(target_path)
+    other = load_model(other_path)
+    result = perform_boolean_operation(target, other, operation_type)
+    save_model(result, output_path)
+    return {
+        'target_volume': calculate_volume(target),
+        'other_volume': calculate_volume(other),
+        'result_volume': calculate_volume(result),
+    }
+
+
 def main():
     # 设置文件路径
     cube_path = "cube.obj"  # 需要修改为实际路径
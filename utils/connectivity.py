@@ -126,10 +126,8 @@ def save_model(obj, filepath):
     print(f"文件已保存：{filepath}")
 
 
-def main():
-    # 模型路径
-    filepath = "cube1.obj"
-
+def repair_file(filepath, output_path=None):
+    """加载、检查并修复模型，返回修复前后的拓扑状态"""
     # 加载模型
     obj = load_model(filepath)
 
@@ -144,6 +142,7 @@ def main():
 
     # 检查连通性
     is_connected_flag = check_connectivity(bm)
+    repaired = True
 
     # 如果存在孔洞或不连通，进行修复
     if not is_closed_flag or not is_connected_flag:
@@ -153,12 +152,25 @@ def main():
             print("拓扑修复成功！")
         else:
             print("警告：修复后仍存在问题！")
+            repaired = False
 
     # 退出编辑模式
     bpy.ops.object.mode_set(mode='OBJECT')
 
     # 保存模型
-    save_model(obj, filepath)
+    save_model(obj, output_path or filepath)
+    return {
+        'closed': is_closed_flag,
+        'connected': is_connected_flag,
+        'repaired': repaired,
+    }
+
+
+def main():
+    # 模型路径
+    filepath = "cube1.obj"
+
+    repair_file(filepath)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,359 @@
+import bpy
+import heapq
+import json
+import math
+import os
+import tempfile
+import numpy as np
+from mathutils.bvhtree import BVHTree
+from scipy.spatial import ConvexHull, QhullError
+
+try:
+    import fcntl
+except ImportError:  # Windows 下没有 fcntl，退化为不加锁
+    fcntl = None
+
+DEFAULT_RATIOS = (1.0, 0.25, 0.05)
+DEFAULT_USES = ('visual', 'contact', 'collision')
+
+
+def get_triangle_arrays(obj):
+    """读取网格三角化后的世界坐标顶点与三角面（foreach_get 批量读取）"""
+    mesh = obj.data
+    mesh.calc_loop_triangles()
+    vertices = np.empty(len(mesh.vertices) * 3, dtype=np.float64)
+    mesh.vertices.foreach_get('co', vertices)
+    faces = np.empty(len(mesh.loop_triangles) * 3, dtype=np.int64)
+    mesh.loop_triangles.foreach_get('vertices', faces)
+
+    matrix = np.array(obj.matrix_world, dtype=np.float64)
+    vertices = vertices.reshape(-1, 3) @ matrix[:3, :3].T + matrix[:3, 3]
+    return vertices, faces.reshape(-1, 3)
+
+
+def _vertex_quadrics(vertices, faces):
+    """按面积加权累加每个顶点的误差二次型"""
+    tri = vertices[faces]
+    normals = np.cross(tri[:, 1] - tri[:, 0], tri[:, 2] - tri[:, 0])
+    double_area = np.linalg.norm(normals, axis=1)
+    normals /= np.maximum(double_area, 1e-12)[:, None]
+    planes = np.concatenate([normals, -np.einsum('fk,fk->f', normals, tri[:, 0])[:, None]], axis=1)
+    face_q = planes[:, :, None] * planes[:, None, :] * (0.5 * double_area)[:, None, None]
+
+    quadrics = np.zeros((len(vertices), 4, 4))
+    for k in range(3):
+        np.add.at(quadrics, faces[:, k], face_q)
+    return quadrics
+
+
+def _collapse_targets(quadrics, positions, edges):
+    """批量计算边折叠的最优位置与代价，矩阵奇异时退回端点或中点"""
+    q = quadrics[edges[:, 0]] + quadrics[edges[:, 1]]
+    a, b = q[:, :3, :3], -q[:, :3, 3]
+    det = np.linalg.det(a)
+    solvable = np.abs(det) > 1e-10
+
+    targets = 0.5 * (positions[edges[:, 0]] + positions[edges[:, 1]])
+    if solvable.any():
+        targets[solvable] = np.linalg.solve(a[solvable], b[solvable][..., None])[..., 0]
+
+    def cost(points):
+        h = np.concatenate([points, np.ones((len(points), 1))], axis=1)
+        return np.einsum('ei,eij,ej->e', h, q, h)
+
+    costs = cost(targets)
+    # 不可解时在两端点与中点中择优
+    for candidate in (positions[edges[:, 0]], positions[edges[:, 1]]):
+        c = cost(candidate)
+        better = ~solvable & (c < costs)
+        targets[better] = candidate[better]
+        costs[better] = c[better]
+    return targets, np.maximum(costs, 0.0)
+
+
+def _unique_edges(faces):
+    edges = np.concatenate([faces[:, [0, 1]], faces[:, [1, 2]], faces[:, [2, 0]]])
+    return np.unique(np.sort(edges, axis=1), axis=0)
+
+
+def _compact(positions, faces):
+    """去除未引用的顶点并重排索引"""
+    used, inverse = np.unique(faces, return_inverse=True)
+    return positions[used].copy(), inverse.reshape(-1, 3)
+
+
+def _on_boundary(faces, vertex_faces, vert):
+    """顶点是否在开放边界上：存在只属于一个面的邻边"""
+    counts = {}
+    for f in vertex_faces[vert]:
+        for other in faces[f].tolist():
+            if other != vert:
+                counts[other] = counts.get(other, 0) + 1
+    return any(c == 1 for c in counts.values())
+
+
+def decimate_progressive(vertices, faces, ratios=DEFAULT_RATIOS):
+    """
+    单次 QEM 边折叠生成 LOD 链：折叠队列只建一次，
+    面数依次降到各级目标时截取快照，不必每级从头简化。
+    Returns:
+      [(vertices, faces, max_quadric_error), ...] 与 ratios 顺序一致
+    """
+    positions = np.asarray(vertices, dtype=np.float64).copy()
+    faces = np.asarray(faces, dtype=np.int64).copy()
+    num_faces = len(faces)
+    order = sorted(range(len(ratios)), key=lambda i: -ratios[i])
+    goals = [max(int(math.ceil(num_faces * ratios[i])), 4) for i in order]
+
+    quadrics = _vertex_quadrics(positions, faces)
+    vertex_faces = [set() for _ in range(len(positions))]
+    for f, tri in enumerate(faces.tolist()):
+        for vert in tri:
+            vertex_faces[vert].add(f)
+    face_alive = np.ones(num_faces, dtype=bool)
+    vertex_alive = np.ones(len(positions), dtype=bool)
+    version = np.zeros(len(positions), dtype=np.int64)
+
+    # 初始队列批量计算
+    edges = _unique_edges(faces)
+    targets, costs = _collapse_targets(quadrics, positions, edges)
+    heap = [(c, int(a), int(b), 0, 0, tuple(t)) for c, (a, b), t in zip(costs.tolist(), edges, targets)]
+    heapq.heapify(heap)
+
+    levels = [None] * len(ratios)
+    alive_faces = num_faces
+    max_error = 0.0
+    step = 0
+
+    while step < len(goals):
+        if alive_faces <= goals[step] or not heap:
+            levels[order[step]] = _compact(positions, faces[face_alive]) + (max_error,)
+            step += 1
+            continue
+
+        cost, a, b, va, vb, target = heapq.heappop(heap)
+        if not (vertex_alive[a] and vertex_alive[b]) or version[a] != va or version[b] != vb:
+            continue
+
+        shared = vertex_faces[a] & vertex_faces[b]
+        moved = (vertex_faces[a] | vertex_faces[b]) - shared
+
+        # 连接条件：a、b 的一环邻域只能共享共有面的对顶点，否则折叠会产生非流形边
+        ring_a = set(faces[list(vertex_faces[a])].ravel().tolist())
+        ring_b = set(faces[list(vertex_faces[b])].ravel().tolist())
+        opposite = set(faces[list(shared)].ravel().tolist())
+        if (ring_a & ring_b) - opposite:
+            continue
+        # 开放网格：两端都在边界上的内部边不能折叠（会把边界缝合）
+        if len(shared) > 1 and _on_boundary(faces, vertex_faces, a) and _on_boundary(faces, vertex_faces, b):
+            continue
+
+        # 折叠后不能与 a 的已有面重合（低面数时的退化情况）
+        kept_a = {frozenset(faces[f].tolist()) for f in vertex_faces[a] - shared}
+        if any(frozenset(a if x == b else x for x in faces[f].tolist()) in kept_a
+               for f in vertex_faces[b] - shared):
+            continue
+        target = np.array(target)
+
+        # 法向翻转检查（受影响的面批量计算）
+        if moved:
+            moved_faces = faces[list(moved)]
+            old_tri = positions[moved_faces]
+            new_tri = old_tri.copy()
+            new_tri[(moved_faces == a) | (moved_faces == b)] = target
+            old_normal = np.cross(old_tri[:, 1] - old_tri[:, 0], old_tri[:, 2] - old_tri[:, 0])
+            new_normal = np.cross(new_tri[:, 1] - new_tri[:, 0], new_tri[:, 2] - new_tri[:, 0])
+            if (np.einsum('fk,fk->f', old_normal, new_normal) <= 0.0).any():
+                continue
+
+        # 折叠 b -> a
+        positions[a] = target
+        quadrics[a] += quadrics[b]
+        vertex_alive[b] = False
+        for f in shared:
+            face_alive[f] = False
+            alive_faces -= 1
+            for vert in faces[f].tolist():
+                vertex_faces[vert].discard(f)
+        for f in vertex_faces[b]:
+            faces[f][faces[f] == b] = a
+            vertex_faces[a].add(f)
+        vertex_faces[b] = set()
+        version[a] += 1
+        max_error = max(max_error, cost)
+
+        # 重新计算与 a 相连的边
+        neighbors = np.array(sorted(set(faces[list(vertex_faces[a])].ravel().tolist()) - {a}), dtype=np.int64)
+        if len(neighbors):
+            new_edges = np.stack([np.full(len(neighbors), a), neighbors], axis=1)
+            new_targets, new_costs = _collapse_targets(quadrics, positions, new_edges)
+            for c, n, t in zip(new_costs.tolist(), neighbors.tolist(), new_targets):
+                heapq.heappush(heap, (c, a, n, int(version[a]), int(version[n]), tuple(t)))
+
+    return levels
+
+
+def convex_hull(vertices):
+    """计算凸包并统一三角面朝外；共面等退化输入用 QJ 微扰重试，仍失败返回 None"""
+    try:
+        hull = ConvexHull(vertices)
+    except QhullError:
+        try:
+            hull = ConvexHull(vertices, qhull_options='QJ')
+        except QhullError:
+            return None
+    faces = hull.simplices.copy()
+    tri = vertices[faces]
+    normals = np.cross(tri[:, 1] - tri[:, 0], tri[:, 2] - tri[:, 0])
+    inward = np.einsum('fk,fk->f', normals, hull.equations[:, :3]) < 0
+    faces[inward] = faces[inward][:, [0, 2, 1]]
+    return _compact(vertices, faces)
+
+
+def surface_deviation(reference, vertices, faces, diagonal):
+    """原始顶点到 LOD 表面（点到三角形）的单侧最近距离（相对包围盒对角线）"""
+    tree = BVHTree.FromPolygons(vertices.tolist(), faces.tolist())
+    distances = np.array([tree.find_nearest(point)[3] for point in reference.tolist()])
+    return float(distances.max() / diagonal), float(distances.mean() / diagonal)
+
+
+def write_obj(filepath, vertices, faces):
+    """写出三角网格为 OBJ"""
+    os.makedirs(os.path.dirname(filepath) or '.', exist_ok=True)
+    with open(filepath, 'w') as f:
+        np.savetxt(f, vertices, fmt='v %.6f %.6f %.6f')
+        np.savetxt(f, faces + 1, fmt='f %d %d %d')
+
+
+def export_visual_obj(obj, filepath):
+    """用 Blender 导出器写出原始网格（保留 UV、法线与材质），坐标系与 write_obj 一致"""
+    os.makedirs(os.path.dirname(filepath) or '.', exist_ok=True)
+    bpy.ops.object.select_all(action='DESELECT')
+    obj.select_set(True)
+    bpy.context.view_layer.objects.active = obj
+    bpy.ops.export_scene.obj(
+        filepath=filepath,
+        use_selection=True,
+        use_triangles=True,
+        use_normals=True,
+        use_uvs=True,
+        use_materials=True,
+        axis_forward='Y',
+        axis_up='Z'
+    )
+
+
+def build_lod_chain(vertices, faces, output_dir, name, ratios=DEFAULT_RATIOS,
+                    uses=DEFAULT_USES, include_hull=True, write_visual=None):
+    """
+    生成全部 LOD 级别（含凸包），写出文件并返回误差指标。
+    write_visual(path) 给出时，未简化的第 0 级由它写出（保留 UV / 法线 / 材质），
+    其余级别只写几何。
+    """
+    vertices = np.asarray(vertices, dtype=np.float64)
+    diagonal = float(np.linalg.norm(vertices.max(axis=0) - vertices.min(axis=0))) or 1.0
+
+    levels = decimate_progressive(vertices, faces, ratios)
+    entries = []
+    for i, (ratio, (lod_vertices, lod_faces, max_error)) in enumerate(zip(ratios, levels)):
+        path = os.path.join(output_dir, f"{name}_lod{i}.obj")
+        if i == 0 and ratio >= 1.0 and write_visual is not None:
+            write_visual(path)
+        else:
+            write_obj(path, lod_vertices, lod_faces)
+        max_dev, mean_dev = surface_deviation(vertices, lod_vertices, lod_faces, diagonal)
+        entries.append({
+            'level': i,
+            'ratio': ratio,
+            'use': uses[i] if i < len(uses) else 'collision',
+            'path': path,
+            'num_vertices': int(len(lod_vertices)),
+            'num_faces': int(len(lod_faces)),
+            'max_quadric_error': float(max_error),
+            'max_deviation': max_dev,
+            'mean_deviation': mean_dev,
+        })
+
+    hull = convex_hull(vertices) if include_hull else None
+    if include_hull and hull is None:
+        print(f"警告：{name} 为退化网格，无法计算凸包，跳过 broad_phase 级别")
+    if hull is not None:
+        hull_vertices, hull_faces = hull
+        path = os.path.join(output_dir, f"{name}_hull.obj")
+        write_obj(path, hull_vertices, hull_faces)
+        max_dev, mean_dev = surface_deviation(vertices, hull_vertices, hull_faces, diagonal)
+        entries.append({
+            'level': len(entries),
+            'ratio': None,
+            'use': 'broad_phase',
+            'path': path,
+            'num_vertices': int(len(hull_vertices)),
+            'num_faces': int(len(hull_faces)),
+            'max_quadric_error': None,
+            'max_deviation': max_dev,
+            'mean_deviation': mean_dev,
+        })
+    return entries
+
+
+def update_part_manifest(manifest_path, part_id, entries):
+    """
+    将 LOD 信息写入部件清单（data/3d_part_information.json 格式）。
+    文件锁串行化多个工作进程的读-改-写，临时文件 + os.replace 保证读者不会读到半个 JSON；
+    路径存为相对清单所在目录，清单可以随仓库拷贝到其他机器。
+    """
+    manifest_dir = os.path.dirname(os.path.abspath(manifest_path))
+    os.makedirs(manifest_dir, exist_ok=True)
+    entries = [dict(entry, path=os.path.relpath(entry['path'], manifest_dir)) for entry in entries]
+
+    with open(manifest_path + '.lock', 'w') as lock:
+        if fcntl is not None:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+        manifest = {}
+        if os.path.exists(manifest_path):
+            with open(manifest_path, 'r', encoding='utf-8') as f:
+                manifest = json.load(f)
+        manifest.setdefault(str(part_id), {})['lod'] = entries
+
+        fd, tmp_path = tempfile.mkstemp(dir=manifest_dir, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(manifest, f, indent=4)
+            os.replace(tmp_path, manifest_path)
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+    print(f"部件清单已更新：{manifest_path}（部件 {part_id}，{len(entries)} 个级别）")
+
+
+def export_lod_chain(obj, part_id, output_dir, manifest_path, ratios=DEFAULT_RATIOS):
+    """修复与标准化之后的 LOD 导出阶段"""
+    vertices, faces = get_triangle_arrays(obj)
+    entries = build_lod_chain(vertices, faces, output_dir, f"part_{part_id}", ratios,
+                              write_visual=lambda path: export_visual_obj(obj, path))
+    update_part_manifest(manifest_path, part_id, entries)
+    for entry in entries:
+        print(f"LOD {entry['level']} ({entry['use']}): {entry['num_faces']} 个面，"
+              f"最大偏差 {entry['max_deviation']:.4f}")
+    return entries
+
+
+def main():
+    # 直接指定路径（无需命令行参数）
+    model_path = "cube1.obj"
+    part_id = 5
+    output_dir = "data/lod"
+    manifest_path = "data/3d_part_information.json"
+
+    bpy.ops.object.select_all(action='DESELECT')
+    bpy.ops.import_scene.obj(filepath=model_path)
+    mesh_objects = [obj for obj in bpy.context.selected_objects if obj.type == 'MESH']
+    if not mesh_objects:
+        print("错误：导入失败，未找到网格对象！")
+        return
+
+    export_lod_chain(mesh_objects[0], part_id, output_dir, manifest_path)
+
+
+if __name__ == "__main__":
+    main()
@@ -38,6 +38,26 @@ class ModelProcessor:
         print(f"原点世界坐标: {origin_world}")
         print("-" * 40)
 
+    def collect_objects_info(self):
+        """收集场景中所有网格物体的变换信息（可序列化）"""
+        objects_info = []
+        for obj in bpy.context.scene.objects:
+            if obj.type != 'MESH':
+                continue
+            if obj.rotation_mode == 'QUATERNION':
+                rotation = obj.rotation_quaternion.to_euler()
+            else:
+                rotation = obj.rotation_euler
+            objects_info.append({
+                'name': obj.name,
+                'location': list(obj.location),
+                'rotation_deg': [math.degrees(rad) for rad in rotation],
+                'scale': list(obj.scale),
+                'num_vertices': len(obj.data.vertices),
+                'num_faces': len(obj.data.polygons),
+            })
+        return objects_info
+
     def _print_all_objects_info(self):
         """打印场景中所有有效网格物体的信息"""
         mesh_objects = [obj for obj in bpy.context.scene.objects if obj.type == 'MESH']